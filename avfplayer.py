@@ -30,15 +30,89 @@
 import sys
 import os
 import argparse
+import queue
+import threading
 import pygame
 import pygame.sndarray
 import numpy as np
 import math
 
+try:
+    # SDL2 hardware renderer - lets the GPU do the window upscale
+    from pygame._sdl2.video import Window, Renderer, Texture
+except ImportError:
+    Renderer = None
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    # Numba is optional - without it the kernels below run as plain Python
+    # and rendering falls back to the NumPy pipeline.
+    HAS_NUMBA = False
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
 # --- CONSTANTS ---
 WIDTH, HEIGHT = 160, 192
 FRAME_SIZE_BYTES = 8704
 HEADER_SIZE = 8192
+SCANLINE_DARKEN = 154   # Darken factor in 8-bit fixed point (0=Black, 256=Transparent), ~0.6
+
+@njit(cache=True, boundscheck=False)
+def _demux_audio(raw, num_frames, is_pal, off1, off2, out):
+    # Extracts the scattered audio samples from the tail of every frame.
+    # 'out' is (num_frames, audio_len) and must be pre-filled with silence (50).
+    for i in range(num_frames):
+        ptr = i * FRAME_SIZE_BYTES + 8192
+        end = (i + 1) * FRAME_SIZE_BYTES
+        ac = out[i]
+        for y in range(32):
+            if ptr+9>=end: break
+            ac[y]=raw[ptr]; ac[y+off1]=raw[ptr+1]
+            ac[y+32+off1]=raw[ptr+2]; ac[y+64+off1]=raw[ptr+3]
+            ac[y+96+off1]=raw[ptr+4]; ac[y+128+off1]=raw[ptr+5]
+            ac[y+160+off1]=raw[ptr+6]; ac[y+off2]=raw[ptr+7]
+            ac[y+32+off2]=raw[ptr+8]; ptr+=10
+        for y in range(19):
+            if ptr>=end: break
+            ac[y+32]=raw[ptr]; ptr+=1
+            if is_pal:
+                if ptr<end: ac[y+64+off2]=raw[ptr]; ptr+=1
+                ptr+=8
+            else: ptr+=9
+        if ptr<end: ac[51]=raw[ptr]
+
+@njit(fastmath=True, cache=True, nogil=True)
+def _render_gtia(palette2d, luma_line, chroma_line, scanlines, blend, out):
+    # Fused render: palette lookup -> x2 horizontal -> blending -> x2 vertical
+    # -> scanlines, written straight into the (192, 160, 3) uint8 'out' buffer.
+    # 'palette2d' is the (16 Chroma, 16 Luma, 3) view of the palette.
+    h, w = luma_line.shape
+    for y in range(h):
+        row = out[2*y]; row_dark = out[2*y+1]
+        pr = 0; pg = 0; pb = 0
+        for x in range(w * 2):
+            c = np.int32(chroma_line[y, x >> 1]); l = np.int32(luma_line[y, x >> 1])
+            if x & 1: ci = c & 0x0F; li = l & 0x0F
+            else: ci = c >> 4; li = l >> 4
+            rgb = palette2d[ci, li]
+            r = np.int32(rgb[0]); g = np.int32(rgb[1]); b = np.int32(rgb[2])
+            
+            # Left output pixel blends with the previous Atari pixel, right one is solid
+            if blend and x > 0: lr = (r + pr) >> 1; lg = (g + pg) >> 1; lb = (b + pb) >> 1
+            else: lr = r; lg = g; lb = b
+            pr = r; pg = g; pb = b
+            
+            ox = 2 * x
+            row[ox, 0] = lr; row[ox, 1] = lg; row[ox, 2] = lb
+            row[ox+1, 0] = r; row[ox+1, 1] = g; row[ox+1, 2] = b
+            if scanlines:
+                # Darken every second line
+                lr = (lr * SCANLINE_DARKEN) >> 8; lg = (lg * SCANLINE_DARKEN) >> 8; lb = (lb * SCANLINE_DARKEN) >> 8
+                r = (r * SCANLINE_DARKEN) >> 8; g = (g * SCANLINE_DARKEN) >> 8; b = (b * SCANLINE_DARKEN) >> 8
+            row_dark[ox, 0] = lr; row_dark[ox, 1] = lg; row_dark[ox, 2] = lb
+            row_dark[ox+1, 0] = r; row_dark[ox+1, 1] = g; row_dark[ox+1, 2] = b
 
 class AVFPlayer:
     def __init__(self, filename, system='PAL', scale=3, debug=False):
@@ -67,148 +141,259 @@ class AVFPlayer:
         self.scale_y = scale
         self.window_w = WIDTH * self.scale_x
         self.window_h = HEIGHT * self.scale_y
-        self.screen = pygame.display.set_mode((self.window_w, self.window_h))
-        pygame.display.set_caption(f"Python AVF Player | {os.path.basename(filename)}")
+        title = f"Python AVF Player | {os.path.basename(filename)}"
+        
+        # Persistent source frame surface (160 x 192), reused every frame
+        self._src_surf = pygame.Surface((WIDTH, HEIGHT))
+        # Persistent overlay state: oscilloscope surface, rendered text keyed by position
+        self._scope_surf = pygame.Surface((self.window_w, 100)); self._scope_surf.set_alpha(150)
+        self._text_cache = {}
+        
+        # Preferred: SDL2 renderer, the frame texture is scaled to the window by the GPU.
+        # Fallback: classic display surface + CPU scaling into a persistent surface.
+        self.renderer = None
+        if Renderer is not None:
+            try:
+                self.window = Window(title, size=(self.window_w, self.window_h))
+                self.renderer = Renderer(self.window)
+                self._frame_tex = Texture(self.renderer, (WIDTH, HEIGHT), streaming=True)
+                self._scope_tex = Texture(self.renderer, (self.window_w, 100), streaming=True)
+                self._scope_tex.alpha = 150; self._scope_tex.blend_mode = 1 # SDL_BLENDMODE_BLEND
+            except pygame.error as e:
+                print(f"[!] SDL2 renderer unavailable ({e}), using software scaling")
+                self.renderer = None
+        if self.renderer is None:
+            self.screen = pygame.display.set_mode((self.window_w, self.window_h))
+            pygame.display.set_caption(title)
+            self._scaled_surf = pygame.Surface((self.window_w, self.window_h))
         
         # --- COLORS (GTIA) ---
         self.phase_shift = 1.8      # Default Phase
         self.saturation = 0.15      # Default Saturation
-        self.palette = self._generate_gtia_palette()
+        self._update_palette()
         
         # --- DATA PROCESSING ---
         print(f"[*] Processing data...")
         self.video_frames, self.final_sound_obj, self.viz_array = self._load_process_full()
         
         self.clock = pygame.time.Clock()
+        # Only queue events the player reacts to (keeps the per-frame poll cheap)
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN])
         self.font = pygame.font.SysFont("Arial", 10, bold=True)
         
-        # Scanline Mask (Pre-calculated for performance)
-        # Resolution: 192 lines. We darken every second line.
-        self.scanline_mask = np.ones((192, 1, 1), dtype=np.float32)
-        self.scanline_mask[1::2, :, :] = 0.6 # Darken factor (0.0=Black, 1.0=Transparent)
+        # Scanline LUT (Pre-calculated for performance)
+        # Maps every 0-255 channel value to its darkened (every second line) value.
+        self.scanline_lut = ((np.arange(256) * SCANLINE_DARKEN) >> 8).astype(np.uint8)
+        
+        # --- RENDER WORKER (double buffering) ---
+        # A worker thread renders the next frame while the current one is on screen.
+        # Two preallocated frame buffers circulate between the worker and the main loop.
+        self._free_bufs = queue.Queue()
+        bufs = [np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8) for _ in range(2)]
+        # Render one dummy frame now, so the kernel is compiled before playback starts
+        self._render_frame(np.zeros((HEIGHT, 40), dtype=np.uint8), bufs[0])
+        for buf in bufs: self._free_bufs.put(buf)
+        self._render_jobs = queue.Queue()
+        self._rendered = queue.Queue()
+        self._render_gen = 0        # Bumped on every setting change, invalidates rendered frames
+        self._render_pending = False
+        self._shown = None          # (f_idx, gen, buffer) of the frame on screen
+        self._last_rendered = None  # (f_idx, gen) currently held by the scaled surface
+        self._render_thread = threading.Thread(target=self._render_worker, daemon=True)
+        self._render_thread.start()
 
     def _generate_gtia_palette(self):
         # Generates a full 256-color Atari palette (16 Hue * 16 Luma) 
         # based on the YIQ/YUV color model used in emulators.
         palette = np.zeros((256, 3), dtype=np.uint8)
+        luma = np.arange(16)
         
         # 1. Grayscale (Chroma=0) - independent of phase
-        for luma in range(16):
-            val = int((luma / 15.0) * 255)
-            palette[luma] = [val, val, val]
-        
-        # 2. Colors (Chroma 1-15)
-        for chroma in range(1, 16):
-            for luma in range(16):
-                # Atari Hue Angle
-                angle = (chroma - 1) * (2 * math.pi / 15.0) + self.phase_shift
-                
-                # Brightness (Luma)
-                y = (luma / 15.0)
-                
-                # Color (Chroma)
-                sat = self.saturation * 0.5 
-                u = sat * math.cos(angle)
-                v = sat * math.sin(angle)
-                
-                # YUV -> RGB Conversion
-                r = y + 1.140 * v
-                g = y - 0.395 * u - 0.581 * v
-                b = y + 2.032 * u
-                
-                rgb = [
-                    max(0, min(255, int(r * 255))),
-                    max(0, min(255, int(g * 255))),
-                    max(0, min(255, int(b * 255)))
-                ]
-                
-                # Index: HighNibble=Chroma, LowNibble=Luma
-                idx = (chroma << 4) | luma
-                palette[idx] = rgb
-                
+        palette[:16] = ((luma / 15.0) * 255).astype(np.uint8)[:, None]
+        
+        # 2. Colors (Chroma 1-15), all at once as a (15 Chroma, 16 Luma) grid
+        chroma = np.arange(1, 16)[:, None]
+        
+        # Atari Hue Angle
+        angle = (chroma - 1) * (2 * math.pi / 15.0) + self.phase_shift
+        
+        # Brightness (Luma)
+        y = (luma[None, :] / 15.0)
+        
+        # Color (Chroma)
+        sat = self.saturation * 0.5 
+        u = sat * np.cos(angle)
+        v = sat * np.sin(angle)
+        
+        # YUV -> RGB Conversion
+        r = y + 1.140 * v
+        g = y - 0.395 * u - 0.581 * v
+        b = y + 2.032 * u
+        
+        rgb = np.stack([r, g, b], axis=-1) * 255
+        
+        # Index: HighNibble=Chroma, LowNibble=Luma (rows 16..255 in order)
+        palette[16:] = np.clip(rgb, 0, 255).astype(np.uint8).reshape(240, 3)
         return palette
 
-    def _decode_frame_gtia(self, luma_block, chroma_block):
-        # Combines Luma and Chroma nibbles into palette indices.
-        indices = (chroma_block.astype(np.int32) << 4) | luma_block.astype(np.int32)
-        return self.palette[indices]
+    def _update_palette(self):
+        # (Re)builds the palette and its lookup tables, all indexed [Chroma, Luma]:
+        # palette2d is a (16, 16, 3) view, palette_wide holds every color twice
+        # so a single lookup yields both screen pixels of a wide Atari pixel.
+        self.palette = self._generate_gtia_palette()
+        self.palette2d = self.palette.reshape(16, 16, 3)
+        self.palette_wide = np.repeat(self.palette2d[:, :, None, :], 2, axis=2)
+
+    def _decode_frame_gtia(self, luma_line, chroma_line, out=None):
+        # Combines packed Luma/Chroma bytes (2 pixels per byte) into RGB,
+        # already scaled x2 horizontally (40 bytes -> 160 screen pixels).
+        # The nibbles index the [Chroma, Luma] table directly (no index packing).
+        # 'out' may be any (h, 160, 3) uint8 view, e.g. every second output line.
+        h, w = luma_line.shape
+        if out is None: out = np.empty((h, w * 4, 3), dtype=np.uint8)
+        rgb = out.view()
+        rgb.shape = (h, w, 2, 2, 3) # Raises instead of silently copying
+        rgb[:, :, 0] = self.palette_wide[chroma_line >> 4, luma_line >> 4]
+        rgb[:, :, 1] = self.palette_wide[chroma_line & 0x0F, luma_line & 0x0F]
+        return out
+
+    def _render_frame(self, vf, out):
+        # Converts one demuxed frame (192 x 40 bytes) into a 192 x 160 RGB image in 'out'.
+        # Split interleaved Luma/Chroma lines
+        chroma_line = (vf[0::2] if self.is_pal else vf[1::2]) 
+        luma_line   = (vf[1::2] if self.is_pal else vf[0::2])
+        
+        h_proc = min(len(chroma_line), len(luma_line))
+        
+        if HAS_NUMBA:
+            # Fused kernel: decoding, scaling, blending and scanlines in one pass
+            _render_gtia(self.palette2d, luma_line[:h_proc], chroma_line[:h_proc],
+                         self.show_scanlines, self.enable_blending, out)
+            return out
+        
+        # Scale vertically x2 (192 x 160): even lines hold the image,
+        # odd lines are a (possibly darkened) copy of the line above.
+        even = out[0::2]
+        
+        # 1. Base RGB Decoding, scaled x2 horizontally (96 x 160)
+        # 2. Horizontal Blending (Blur) - integer (a+b)>>1 average
+        if self.enable_blending:
+            rgb_wide = self._decode_frame_gtia(luma_line[:h_proc], chroma_line[:h_proc])
+            a = rgb_wide.astype(np.uint16)
+            even[:, 1:] = (a[:, 1:] + a[:, :-1]) >> 1
+            even[:, 0] = rgb_wide[:, 0]
+        else:
+            # Nothing to blend - decode straight into the output, no temporary
+            self._decode_frame_gtia(luma_line[:h_proc], chroma_line[:h_proc], even)
+        
+        # 3. Scanlines (Vertical lines) - only the duplicated lines are darkened
+        if self.show_scanlines:
+            out[1::2] = self.scanline_lut[even]
+        else:
+            out[1::2] = even
+        return out
+
+    def _render_worker(self):
+        # Worker thread: renders requested frames into free buffers.
+        # All rendering happens on this thread, the main loop only consumes finished buffers.
+        while True:
+            job = self._render_jobs.get()
+            if job is None: break
+            f_idx, gen = job
+            buf = self._free_bufs.get()
+            try:
+                self._render_frame(self.video_frames[f_idx], buf)
+            except Exception as e:
+                # Hand the error to the main loop (re-raised in _acquire_frame)
+                self._free_bufs.put(buf)
+                self._rendered.put((f_idx, gen, e))
+                continue
+            self._rendered.put((f_idx, gen, buf))
+
+    def _acquire_frame(self, f_idx):
+        # Returns a buffer with frame f_idx rendered using the current settings,
+        # then queues the following frame so it renders while this one is shown.
+        while True:
+            if not self._render_pending:
+                self._render_jobs.put((f_idx, self._render_gen))
+            idx, gen, buf = self._rendered.get()
+            self._render_pending = False
+            if isinstance(buf, Exception): raise buf
+            if (idx, gen) == (f_idx, self._render_gen): break
+            self._free_bufs.put(buf) # Stale (skipped frame or old settings)
+        
+        if self._shown: self._free_bufs.put(self._shown[2])
+        self._shown = (f_idx, gen, buf)
+        
+        if f_idx + 1 < self.video_frames.shape[0]:
+            self._render_jobs.put((f_idx + 1, gen))
+            self._render_pending = True
+        return buf
 
     def _load_process_full(self):
-        # 1. READ FILE
+        # 1. MAP FILE (memory-mapped, so the raw file is never fully read into RAM)
         size = os.path.getsize(self.filename)
-        with open(self.filename, "rb") as f:
-            if size % FRAME_SIZE_BYTES != 0: f.seek(HEADER_SIZE)
-            raw = f.read()
-
-        num_frames = len(raw) // FRAME_SIZE_BYTES
-        video_frames = []
-        audio_chunks = []
+        offset = HEADER_SIZE if size % FRAME_SIZE_BYTES != 0 else 0
+        num_frames = max(0, size - offset) // FRAME_SIZE_BYTES
+        if num_frames:
+            arr = np.asarray(np.memmap(self.filename, dtype=np.uint8, mode='r',
+                                       offset=offset, shape=(num_frames * FRAME_SIZE_BYTES,)))
+        else:
+            arr = np.zeros(0, dtype=np.uint8)
         
         off1, off2 = (120, 52) if self.is_pal else (70, 52)
         audio_len = 312 if self.is_pal else 262
         
-        # 2. DEMUX LOOP
-        for i in range(num_frames):
-            base = i * FRAME_SIZE_BYTES
-            chunk = raw[base : base+FRAME_SIZE_BYTES]
-            
-            # --- Video extraction ---
-            v = np.zeros((HEIGHT, 40), dtype=np.uint8)
-            for b in range(64):
-                bb = b*128; y=b*3
-                v[y] = np.frombuffer(chunk[bb+1:bb+41], dtype=np.uint8)
-                v[y+1] = np.frombuffer(chunk[bb+45:bb+85], dtype=np.uint8)
-                v[y+2] = np.frombuffer(chunk[bb+88:bb+128], dtype=np.uint8)
-            video_frames.append(v)
-            
-            # --- Audio extraction ---
-            ptr = 8192; ac = np.full(512, 50, dtype=np.uint8)
-            for y in range(32):
-                if ptr+9>=len(chunk): break
-                ac[y]=chunk[ptr]; ac[y+off1]=chunk[ptr+1]
-                ac[y+32+off1]=chunk[ptr+2]; ac[y+64+off1]=chunk[ptr+3]
-                ac[y+96+off1]=chunk[ptr+4]; ac[y+128+off1]=chunk[ptr+5]
-                ac[y+160+off1]=chunk[ptr+6]; ac[y+off2]=chunk[ptr+7]
-                ac[y+32+off2]=chunk[ptr+8]; ptr+=10
-            for y in range(19):
-                if ptr>=len(chunk): break
-                ac[y+32]=chunk[ptr]; ptr+=1
-                if self.is_pal:
-                    if ptr<len(chunk): ac[y+64+off2]=chunk[ptr]; ptr+=1
-                    ptr+=8
-                else: ptr+=9
-            if ptr<len(chunk): ac[51]=chunk[ptr]
-            audio_chunks.append(ac[:audio_len])
+        # 2. VIDEO DEMUX (vectorized)
+        # Each 128-byte block holds 3 lines of 40 bytes at offsets 1, 45 and 88.
+        blocks = arr.reshape(num_frames, FRAME_SIZE_BYTES)[:, :8192].reshape(num_frames, 64, 128)
+        line_idx = np.r_[1:41, 45:85, 88:128]
+        video_frames = np.empty((num_frames, HEIGHT, 40), dtype=np.uint8)
+        # mode='clip' lets np.take write straight into 'out' (no internal buffering)
+        np.take(blocks, line_idx, axis=2, out=video_frames.reshape(num_frames, 64, 120), mode='clip')
+        
+        # 3. AUDIO DEMUX (compiled) - straight into one contiguous, silence-filled matrix
+        audio = np.full((num_frames, audio_len), 50, dtype=np.uint8)
+        _demux_audio(arr, num_frames, self.is_pal, off1, off2, audio)
 
-        # 3. AUDIO SYNC & RESAMPLING
-        raw_audio = np.concatenate(audio_chunks).astype(np.float32) if audio_chunks else np.zeros(1000)
-        # Center to 0 (Atari uses 0-100, silence ~50)
-        raw_audio = np.clip(raw_audio, 0, 100) - 50.0
+        # 4. AUDIO SYNC & RESAMPLING
+        # Center to 0 (Atari uses 0-100, silence ~50) and scale to int16 range
+        # here, on the short source track, so the resampled output needs no multiply.
+        if num_frames:
+            np.minimum(audio, 100, out=audio)
+            raw_audio = audio.reshape(-1).astype(np.float32)
+            raw_audio -= 50.0
+            raw_audio *= 500.0
+        else:
+            raw_audio = np.zeros(1000)
         
         # Calculate precise duration
         vid_dur = num_frames / self.fps
         tgt_samples = int(vid_dur * self.mix_freq)
         
         # Time Stretch Interpolation
-        resampled = np.interp(
-            np.linspace(0, 1, tgt_samples),
-            np.linspace(0, 1, len(raw_audio)),
-            raw_audio
-        )
-        # Scaling & Clipping to int16
-        resampled = np.clip(resampled * 500.0, -32000, 32000).astype(np.int16)
+        src_len = len(raw_audio)
+        if tgt_samples == src_len:
+            resampled = raw_audio
+        else:
+            ratio = (src_len - 1) / max(1, tgt_samples - 1)
+            resampled = np.interp(np.arange(tgt_samples, dtype=np.float64) * ratio,
+                                  np.arange(src_len, dtype=np.float64), raw_audio)
+        # Clipping (in place) & conversion to int16
+        np.clip(resampled, -32000, 32000, out=resampled)
+        resampled = resampled.astype(np.int16)
         
         # Hardware Channel Mapping (Mono -> N-Channels)
+        # Broadcasting is a view, so the interleaved copy is materialized only once.
         if self.mix_chans > 1:
-            final = np.tile(resampled.reshape(-1, 1), (1, self.mix_chans))
+            final = np.ascontiguousarray(np.broadcast_to(resampled[:, None], (resampled.shape[0], self.mix_chans)))
         else:
-            final = resampled
-            
-        final = np.ascontiguousarray(final)
+            final = np.ascontiguousarray(resampled)
         snd = pygame.sndarray.make_sound(final)
         
-        # Visualization array (take only first channel)
-        viz = final[:, 0] if self.mix_chans > 1 else final
+        # Visualization array (mono track, identical to every channel)
+        viz = resampled
         
         return video_frames, snd, viz
 
@@ -234,7 +419,7 @@ class AVFPlayer:
                     f_idx = int((ticks/1000.0) * self.fps)
                 
                 # Handle End of File
-                if f_idx >= len(self.video_frames):
+                if f_idx >= self.video_frames.shape[0]:
                     self.final_sound_obj.stop()
                     if self.looping: 
                         loop_active = False # Triggers restart
@@ -243,103 +428,104 @@ class AVFPlayer:
                         running = False 
                         break
 
-                # Input Handling
-                for e in pygame.event.get():
-                    if e.type == pygame.QUIT: running=False; loop_active=False
-                    if e.type == pygame.KEYDOWN:
-                        if e.key == pygame.K_ESCAPE: running=False; loop_active=False
-                        if e.key == pygame.K_l: self.looping = not self.looping
-                        if e.key == pygame.K_d: self.debug_mode = not self.debug_mode
-                        if e.key == pygame.K_s: self.show_scanlines = not self.show_scanlines
-                        if e.key == pygame.K_b: self.enable_blending = not self.enable_blending
-                        if e.key == pygame.K_SPACE:
-                            if paused: pygame.mixer.unpause(); start_ticks += (pygame.time.get_ticks()-pause_start); paused=False
-                            else: pygame.mixer.pause(); pause_start = pygame.time.get_ticks(); paused=True
-                        
-                        # Live Tuning
-                        mods = pygame.key.get_mods()
-                        regen = False
-                        if mods & pygame.KMOD_SHIFT:
-                            if e.key == pygame.K_RIGHTBRACKET: self.saturation = min(2.0, self.saturation + 0.05); regen=True
-                            if e.key == pygame.K_LEFTBRACKET: self.saturation = max(0.0, self.saturation - 0.05); regen=True
-                        else:
-                            if e.key == pygame.K_LEFTBRACKET: self.phase_shift -= 0.05; regen=True
-                            if e.key == pygame.K_RIGHTBRACKET: self.phase_shift += 0.05; regen=True
-                        
-                        if regen: self.palette = self._generate_gtia_palette()
+                # Input Handling (peek also pumps the OS event queue)
+                if pygame.event.peek((pygame.QUIT, pygame.KEYDOWN)):
+                    mods = pygame.key.get_mods()
+                    for e in pygame.event.get():
+                        if e.type == pygame.QUIT: running=False; loop_active=False
+                        if e.type == pygame.KEYDOWN:
+                            if e.key == pygame.K_ESCAPE: running=False; loop_active=False
+                            if e.key == pygame.K_l: self.looping = not self.looping
+                            if e.key == pygame.K_d: self.debug_mode = not self.debug_mode
+                            if e.key == pygame.K_s: self.show_scanlines = not self.show_scanlines; self._render_gen += 1
+                            if e.key == pygame.K_b: self.enable_blending = not self.enable_blending; self._render_gen += 1
+                            if e.key == pygame.K_SPACE:
+                                if paused: pygame.mixer.unpause(); start_ticks += (pygame.time.get_ticks()-pause_start); paused=False
+                                else: pygame.mixer.pause(); pause_start = pygame.time.get_ticks(); paused=True
+                            
+                            # Live Tuning
+                            regen = False
+                            if mods & pygame.KMOD_SHIFT:
+                                if e.key == pygame.K_RIGHTBRACKET: self.saturation = min(2.0, self.saturation + 0.05); regen=True
+                                if e.key == pygame.K_LEFTBRACKET: self.saturation = max(0.0, self.saturation - 0.05); regen=True
+                            else:
+                                if e.key == pygame.K_LEFTBRACKET: self.phase_shift -= 0.05; regen=True
+                                if e.key == pygame.K_RIGHTBRACKET: self.phase_shift += 0.05; regen=True
+                            
+                            if regen: self._update_palette(); self._render_gen += 1
 
                 if paused: self.clock.tick(10); continue
 
                 # --- RENDER PIPELINE ---
-                vf = self.video_frames[f_idx]
-                
-                # Split interleaved Luma/Chroma lines
-                chroma_line = (vf[0::2] if self.is_pal else vf[1::2]) 
-                luma_line   = (vf[1::2] if self.is_pal else vf[0::2])
-                
-                h_proc = min(len(chroma_line), len(luma_line))
-                
-                # Unpack nibbles (96 lines, 80 bytes -> 160 pixels)
-                c_unp = np.stack([(chroma_line[:h_proc]>>4)&0xF, chroma_line[:h_proc]&0xF], axis=-1).reshape(h_proc, 80)
-                l_unp = np.stack([(luma_line[:h_proc]>>4)&0xF, luma_line[:h_proc]&0xF], axis=-1).reshape(h_proc, 80)
-                
-                # 1. Base RGB Decoding (96 x 80)
-                rgb_base = self._decode_frame_gtia(l_unp, c_unp).astype(np.float32)
+                # The loop runs faster than the video, so the same frame often comes up
+                # twice - then the already uploaded/scaled frame is simply presented again.
+                if self._last_rendered != (f_idx, self._render_gen):
+                    rgb_192 = self._acquire_frame(f_idx)
+                    pygame.surfarray.blit_array(self._src_surf, rgb_192.swapaxes(0, 1))
+                    if self.renderer: self._frame_tex.update(self._src_surf)
+                    else: pygame.transform.scale(self._src_surf, (self.window_w, self.window_h), self._scaled_surf)
+                    self._last_rendered = (f_idx, self._render_gen)
                 
-                # Scale horizontally x2 (96 x 160)
-                rgb_wide = np.repeat(rgb_base, 2, axis=1)
-
-                # 2. Horizontal Blending (Blur)
-                if self.enable_blending:
-                    blended = np.zeros_like(rgb_wide)
-                    blended[:, 1:] = (rgb_wide[:, 1:] + rgb_wide[:, :-1]) * 0.5
-                    blended[:, 0] = rgb_wide[:, 0]
-                    rgb_wide = blended
-
-                # Scale vertically x2 (192 x 160)
-                rgb_192 = np.repeat(rgb_wide, 2, axis=0)
-                
-                # 3. Scanlines (Vertical lines)
-                if self.show_scanlines:
-                    rgb_192 = (rgb_192 * self.scanline_mask).astype(np.uint8)
-                else:
-                    rgb_192 = rgb_192.astype(np.uint8)
-
                 # Blit to screen
-                surf = pygame.surfarray.make_surface(rgb_192.swapaxes(0, 1))
-                self.screen.blit(pygame.transform.scale(surf, (self.window_w, self.window_h)), (0,0))
+                if self.renderer: self._frame_tex.draw(dstrect=(0, 0, self.window_w, self.window_h))
+                else: self.screen.blit(self._scaled_surf, (0,0))
 
                 # GUI Overlays
                 if self.debug_mode: self._draw_oscilloscope(ticks)
                 else: self._draw_progressbar(f_idx)
                 
                 status = f"S:{'ON' if self.show_scanlines else 'OFF'} | B:{'ON' if self.enable_blending else 'OFF'}"
-                lbl = self.font.render(f"{status} | Ph: {self.phase_shift:.2f} | Sat: {self.saturation:.2f}", True, (255,255,0))
-                self.screen.blit(lbl, (10, 10))
+                self._blit_text(f"{status} | Ph: {self.phase_shift:.2f} | Sat: {self.saturation:.2f}", (255,255,0), (10, 10))
 
-                pygame.display.flip()
+                self._present()
                 self.clock.tick(self.fps * 1.5)
+        self._render_jobs.put(None); self._render_thread.join()
         pygame.quit()
 
     def _draw_oscilloscope(self, ms):
         idx = int((ms/1000.0)*self.mix_freq); w=1000
         if idx < len(self.viz_array):
             c = self.viz_array[idx:idx+w]
-            s=pygame.Surface((self.window_w, 100)); s.set_alpha(150); s.fill((0,0,0))
+            s=self._scope_surf; s.fill((0,0,0))
             pygame.draw.line(s,(50,50,50),(0,50),(self.window_w,50))
-            pts=[]
-            if len(c)>0:
-                step=max(1, len(c)/self.window_w)
-                for i in range(0,len(c),int(step)):
-                    pts.append(((i/len(c))*self.window_w, 50-(c[i]/32000*50)))
-                if len(pts)>1: pygame.draw.lines(s,(0,255,0),False,pts,2)
-            self.screen.blit(s,(0,self.window_h-100))
+            if len(c)>1:
+                # At most ~1 point per screen pixel, computed in one go
+                step=max(1, len(c)//self.window_w)
+                xs=np.arange(0, len(c), step) * (self.window_w/len(c))
+                ys=50 - c[::step] * (50/32000)
+                pts=np.column_stack((xs, ys)).tolist()
+                if len(pts)>1: pygame.draw.aalines(s,(0,255,0),False,pts)
+            if self.renderer:
+                self._scope_tex.update(s); self._scope_tex.draw(dstrect=(0,self.window_h-100,self.window_w,100))
+            else: self.screen.blit(s,(0,self.window_h-100))
 
     def _draw_progressbar(self, idx):
         y=self.window_h-10; w=self.window_w
-        pygame.draw.rect(self.screen,(50,50,50),(0,y,w,10))
-        pygame.draw.rect(self.screen,(0,100,255),(0,y, (idx/len(self.video_frames))*w, 10))
-        if self.looping: t=self.font.render("LOOP",1,(0,255,0)); self.screen.blit(t,(w-50,10))
+        self._fill_rect((50,50,50),(0,y,w,10))
+        self._fill_rect((0,100,255),(0,y, (idx/self.video_frames.shape[0])*w, 10))
+        if self.looping: self._blit_text("LOOP",(0,255,0),(w-50,10))
+
+    # --- OUTPUT HELPERS (SDL2 renderer or display surface) ---
+    def _blit_text(self, text, color, pos):
+        # Re-render (and re-upload) only when the text at this position changes
+        cached = self._text_cache.get(pos)
+        if cached is None or cached[0] != (text, color):
+            surf = self.font.render(text, True, color)
+            img = Texture.from_surface(self.renderer, surf) if self.renderer else surf
+            cached = self._text_cache[pos] = ((text, color), img, surf.get_size())
+        _, img, size = cached
+        if self.renderer: img.draw(dstrect=(pos, size))
+        else: self.screen.blit(img, pos)
+
+    def _fill_rect(self, color, rect):
+        if not self.renderer: pygame.draw.rect(self.screen, color, rect); return
+        rect = pygame.Rect(rect)
+        if rect.width > 0 and rect.height > 0: # SDL would still draw an empty rect as 1px
+            self.renderer.draw_color = pygame.Color(color); self.renderer.fill_rect(rect)
+
+    def _present(self):
+        if self.renderer: self.renderer.present()
+        else: pygame.display.flip()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="AVF Video Player")